@@ -8,27 +8,106 @@
 ## Date : 2022-08-29
 ##################################################
 
-import serial
 import binascii
 import struct
 import time
-from datetime import datetime
 import numpy as np
-import math
-import os
-import matplotlib.pyplot as plt
+import logging
+import sys
 import usb.core
 import usb.util
-from pyftdi.ftdi import Ftdi
-import pyftdi.serialext
+from pyftdi.ftdi import Ftdi, FtdiError
 from tau2_instructions import *
 
+log_cam = logging.getLogger(__name__)
+
+_PACKET_LAYOUT = {0: struct.Struct(">8s3x")} # packet layouts (header + CRC, argument, CRC), keyed by argument byte count
+_REPLY = {0: struct.Struct(">ccxcccccxx")} # reply layouts, keyed by reply byte count
+_S_I16 = struct.Struct(">h") # signed 16-bit big-endian values (temperatures, modes, arguments)
+_S_U16 = struct.Struct(">H") # byte count and CRC of a reply header
+_S_PLANCK = struct.Struct(">IIIi") # Planck coefficients R, B, F, O
+_PACKETS = {} # packets of fixed-argument commands, keyed by (function code, argument)
+
+# Read-only commands, the only ones flush_packets sends back-to-back in a single write
+_GETTERS = frozenset((GET_SERIAL_NUMBER, GET_REVISION, GET_BAUD_RATE, GET_GAIN_MODE, GET_FFC_MODE, GET_FFC_NFRAMES,
+                      GET_FFC_PERIOD, GET_FFC_TEMP_DELTA, GET_FFC_WARN_TIME, GET_DIGITAL_OUTPUT_MODE, GET_XP_MODE,
+                      GET_CMOS_BIT_DEPTH, GET_AGC_ACE_CORRECT, GET_LENS_NUMBER, GET_FPA_TEMPERATURE,
+                      GET_HOUSING_TEMPERATURE, GET_SHUTTER_TEMP, GET_SHUTTER_TEMP_MODE, GET_TLINEAR_MODE,
+                      GET_LENS_RESPONSE_PARAMS, GET_SCENE_PARAMS, GET_PLANCK_COEFFICIENTS))
+
+# Camera status code -> (message, log level, reply is valid)
+_STATUS_TABLE = {CAM_OK: ("Response OK", logging.DEBUG, True),
+                 CAM_BYTE_COUNT_ERROR: ("Byte count error.", logging.WARNING, False),
+                 CAM_FEATURE_NOT_ENABLED: ("Feature not enabled.", logging.WARNING, False),
+                 CAM_NOT_READY: ("Camera not ready.", logging.WARNING, False),
+                 CAM_RANGE_ERROR: ("Camera range error.", logging.WARNING, False),
+                 CAM_TIMEOUT_ERROR: ("Camera timeout error.", logging.WARNING, False),
+                 CAM_UNDEFINED_ERROR: ("Camera returned an undefined error.", logging.WARNING, False),
+                 CAM_UNDEFINED_FUNCTION_ERROR: ("Camera function undefined. Check the function code.", logging.WARNING, False),
+                 CAM_UNDEFINED_PROCESS_ERROR: ("Camera process undefined.", logging.WARNING, False)
+                }
+_STATUS_UNKNOWN = ("Camera returned an unknown status code.", logging.WARNING, False)
+
+# Fixed arguments of the getters/actions, and sub-function prefixes of the setters
+_ARG_ACE_CORRECT_OFF = b'\x00\x00'
+_ARG_FPA_TEMPERATURE = b'\x00\x00'
+_ARG_HOUSING_TEMPERATURE = b'\x00\x0A'
+_ARG_SHUTTER_TEMP_MODE = b'\x00\x01\x00\x00'
+_PREFIX_SHUTTER_TEMP_MODE = b'\x00\x00'
+_ARG_FFC_LONG = b'\x00\x01'
+_ARG_PLANCK_COEFFICIENTS = b'\x02\x00'
+_ARG_FFC_NFRAMES = b'\x00\x03\x00\x00'
+_PREFIX_FFC_NFRAMES = b'\x00\x02'
+_ARG_XP_MODE = b'\x02\x00'
+_PREFIX_XP_MODE = b'\x03'
+_ARG_CMOS_BIT_DEPTH = b'\x08\x00'
+_PREFIX_CMOS_BIT_DEPTH = b'\x06'
+_ARG_TLINEAR_RESOLUTION = b'\x00\x10' # get argument and set prefix
+_ARG_TLINEAR_MODE = b'\x00\x40' # get argument and set prefix
+_ARG_LENS_RESPONSE_PARAMS = b'\x00\x00'
+
+# Setting value returned by the camera -> description
+_BAUD_RATE_STR = {0: "BAUD RATE : 0X0000 = Auto baud",
+                  1: "BAUD RATE : 0X0001 = 9600 baud",
+                  2: "BAUD RATE : 0X0002 = 19200 baud",
+                  4: "BAUD RATE : 0X0004 = 57600 baud",
+                  5: "BAUD RATE : 0X0005 = 115200 baud",
+                  6: "BAUD RATE : 0X0006 = 460800 baud",
+                  7: "BAUD RATE : 0X0007 = 921600 baud"}
+_GAIN_MODE_STR = {b'\x00\x00': "GAIN MODE : 0X0000 = Automatic",
+                  b'\x00\x01': "GAIN MODE : 0X0001 = Low Gain Only",
+                  b'\x00\x02': "GAIN MODE : 0X0002 = High Gain Only",
+                  b'\x00\x03': "GAIN MODE : 0X0003 = Manual"}
+_SHUTTER_TEMP_MODE_STR = {b'\x00\x00': "SHUTTER TEMP MODE : 0X0000 = User, User specified shutter temperature",
+                          b'\x00\x01': "SHUTTER TEMP MODE : 0X0001 = Automatic, calibrated temperatures",
+                          b'\x00\x02': "SHUTTER TEMP MODE : 0x0002 = Static, shutter-less operation"}
+_FFC_MODE_STR = {b'\x00\x00': "FFC MODE : 0X0000 = Manual",
+                 b'\x00\x01': "FFC MODE : 0X0001 = Automatic",
+                 b'\x00\x02': "FFC MODE : 0X0002 =  External"}
+_FFC_FRAMES_STR = {b'\x00\x00': "FFC NFRAMES : 0X0000 = 4 frames",
+                   b'\x00\x01': "FFC NFRAMES : 0X0001 = 8 frames",
+                   b'\x00\x02': "FFC NFRAMES : 0X0002 =  16 frames"}
+_XP_MODE_STR = {b'\x00\x00': "XP MODE : 0x0000 = DISABLED",
+                b'\x00\x01': "XP MODE : 0x0001 = BT656",
+                b'\x00\x02': "XP MODE : 0x0002 = CMOS 14-bit w/ 1 discrete",
+                b'\x00\x03': "XP MODE : 0x0003 = CMOS 8-bit w/ 8 discretes",
+                b'\x00\x04': "XP MODE : 0x0004 = CMOS 16-bit"}
+_CMOS_BIT_DEPTH_STR = {b'\x00\x00': "CMOS BIT DEPTH : 0x0000 = 14bit",
+                       b'\x00\x01': "CMOS BIT DEPTH : 0x0001 = 8bit post-AGC/pre-colorize",
+                       b'\x00\x02': "CMOS BIT DEPTH : 0x0002 = 8bit Bayer encoded",
+                       b'\x00\x03': "CMOS BIT DEPTH : 0x0003 = 16bit YCbCr",
+                       b'\x00\x04': "CMOS BIT DEPTH : 0x0004 = 8bit 2x Clock YCbCr"}
+_TLINEAR_RESOLUTION_STR = {b'\x00\x00': "TLIN OUTPUT MODE : 0x0000 = Low resolution mode",
+                           b'\x00\x01': "TLIN OUTPUT MODE : 0x0001 = High resolution mode"}
+_TLINEAR_MODE_STR = {b'\x00\x00': "TLIN MODE DISABLED : 0x0000 = disabled",
+                     b'\x00\x01': "TLIN MODE ENABLED : 0x0001 = enabled"}
+
 class FLIR_Tau2(object):
     """
     Class for command/control and data acquisition for the Teax ThermalCapture Grabber USB w/ FLIR Tau2 camera
     """
 
-    def __init__(self, vid=0x0403, pid=0x6010, width=640, height=512):
+    def __init__(self, vid=0x0403, pid=0x6010, width=640, height=512, verbose=False):
         """Initialize FTDI connection to the FLIR Tau2 camera for acquisition
 
         Parameters
@@ -41,15 +120,33 @@ class FLIR_Tau2(object):
            Width of images (default = 640 px)
         height : int
            Height of images (default = 512 px)
+        verbose : bool
+           Attach a stdout handler to the module-level tau2 logger and lower it to INFO, printing the status messages
+           and the value returned by each camera command (default = False). This configures module logging, so it also applies to every
+           other FLIR_Tau2 instance; the handler is only attached if the logger has none yet
 
         """
         
+        if verbose and not log_cam.handlers: # keep handlers already set by a previous instance or the application
+            handler = logging.StreamHandler(sys.stdout) # mirror command values to stdout
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            handler.setLevel(logging.INFO)
+            log_cam.addHandler(handler)
+            if log_cam.getEffectiveLevel() > logging.INFO:
+                log_cam.setLevel(logging.INFO)
         self.dev = usb.core.find(idVendor=vid, idProduct=pid)
         self._ftdi = None
+        self._latency_ms = None # current FTDI latency timer, set with set_latency
+        self.current_mode = None # 'serial' or 'syncff', set by connect/set_mode
         self.frame_size = 2*height*width+10+4*height # 10 byte header, 4 bytes pad per row
         self.magic_ftdi = b'TEAX'
         self.magic_uart = b'UART'
-        
+        self._temperatures = None # cached (fpa, housing) temperatures
+        self._temperatures_time = 0.0
+        self._pending_packets = [] # packets queued with _queue_packet
+        self._pending_commands = []
+        self._needs_purge = True # purge buffers before the next command
+
         if self.dev is not None:
             self.connect(mode='serial')
             self._sync(allow_timeout=True)
@@ -71,26 +168,31 @@ class FLIR_Tau2(object):
         
         self._ftdi = Ftdi()
         self._ftdi.open_from_device(self.dev)
-        
+        self._latency_ms = Ftdi.LATENCY_MIN # open_from_device sets the minimum latency timer (1 ms)
+        self._needs_purge = True # new session, the device may still hold stale bytes
+        self._ftdi.read_data_set_chunksize(16*1024) # larger bulk requests, fewer USB round-trips per frame (16 KiB is the Linux maximum in pyftdi)
+
         if self._ftdi.is_connected == True:
-            print("========== ACQ : Connected to the FLIR Tau2 camera ==========")
+            log_cam.info("========== ACQ : Connected to the FLIR Tau2 camera ==========")
             if mode == 'serial':
                 self._ftdi.set_bitmode(0xFF, Ftdi.BitMode.RESET)
+                self.set_latency(1) # short command replies are flushed to the host as soon as possible
                 self.current_mode = 'serial'
                 self.settings_state = self.check_settings()
                 if self.settings_state == True:
-                    print("CMD : ALL PARAMETERS SET, CAN START ACQUISITION")
+                    log_cam.info("CMD : ALL PARAMETERS SET, CAN START ACQUISITION")
                     self.do_ffc_short()
                 else:
-                    print("CMD : AN ERROR OCCURED WHILE SETTING UP PARAMETERS")
+                    log_cam.warning("CMD : AN ERROR OCCURED WHILE SETTING UP PARAMETERS")
                     self.__exit__()            
             else: 
                 self._ftdi.set_bitmode(0xFF, Ftdi.BitMode.SYNCFF)
+                self.set_latency(1)
                 self.current_mode = 'syncff'
             # self._ftdi.set_baudrate(baudrate=12e6) # 12MBaud maximum of FT2232H
             self._ftdi.purge_buffers()
         else:
-            print("========== ACQ : An error occurred while trying to establish connection with FLIR TAU2 camera with FTDI protocol ==========")
+            log_cam.warning("========== ACQ : An error occurred while trying to establish connection with FLIR TAU2 camera with FTDI protocol ==========")
         
     def get_mode(self, display = False):
         """Get current operating mode
@@ -121,12 +223,33 @@ class FLIR_Tau2(object):
         """
         if mode == 'serial':
             self._ftdi.set_bitmode(0xFF, Ftdi.BitMode.RESET)
+            self.set_latency(1)
             self.current_mode = 'serial'
         else:
             self._ftdi.set_bitmode(0xFF, Ftdi.BitMode.SYNCFF)
+            self.set_latency(1)
             self.current_mode = 'syncff'
         self._ftdi.purge_buffers()
-        print('Current mode is : {}'.format(self.current_mode))
+        self._needs_purge = True # bytes from the previous mode may arrive after the purge
+        log_cam.info("Current mode is : %s", self.current_mode)
+
+    def set_latency(self, latency):
+        """Set the FTDI latency timer, i.e. the delay before a partially filled USB packet is sent to the host
+
+        Parameters
+        ----------
+        latency : int
+            Latency timer in ms (Ftdi.LATENCY_MIN-Ftdi.LATENCY_MAX, open_from_device sets Ftdi.LATENCY_MIN = 1 ms)
+
+        """
+        if latency == self._latency_ms:
+            return # already set, skip the USB control transfer
+        try:
+            self._ftdi.set_latency_timer(latency)
+        except (ValueError, FtdiError) as e: # out of range latency or USB error
+            log_cam.warning("ACQ : Could not set FTDI latency timer to %s ms: %s", latency, e)
+            return
+        self._latency_ms = latency
         
     def _claim_dev(self):
         """Claim USB interface"""
@@ -148,7 +271,7 @@ class FLIR_Tau2(object):
                     try:
                         self.dev.detach_kernel_driver(intf.bInterfaceNumber)
                     except usb.core.USBError as e:
-                        print("ACQ : Could not detatch kernel driver from interface({0}): {1}".format(intf.bInterfaceNumber, str(e)))
+                        log_cam.warning("ACQ : Could not detatch kernel driver from interface(%s): %s", intf.bInterfaceNumber, e)
     
     def _read(self, n_bytes=0, packets_per_transfer=8, num_transfers=256):
         """Read bytes from device
@@ -164,7 +287,7 @@ class FLIR_Tau2(object):
 
         Returns
         -------
-        self._ftdi.read_data(n_bytes) : bytes
+        self._ftdi.read_data_bytes(n_bytes, 1) : bytearray
             Raw response from the camera in bytes
 
         """
@@ -174,7 +297,8 @@ class FLIR_Tau2(object):
         if n_bytes == 0:
             n_bytes = packets_per_transfer * FTDI_PACKET_SIZE
   
-        return self._ftdi.read_data(n_bytes)
+        # read_data() only wraps this call in bytes(), an extra copy of every chunk
+        return self._ftdi.read_data_bytes(n_bytes, 1)
                 
     def _sync(self, allow_timeout=False):
         """Sync output buffer with TEAX magic keyword
@@ -187,20 +311,32 @@ class FLIR_Tau2(object):
         Returns
         -------
         data[data.find(magic):] : bytesarray
-            Raw response from the camera in bytes
+            Raw response from the camera in bytes, starting with the magic keyword (None on timeout)
 
         """
         
-        data = self._read()
-        t = time.time()
-        while data.find(self.magic_ftdi) == -1:
-            data = self._read()
-            if not allow_timeout and time.time()-t > 0.2:
-                print("Timeout in frame sync")
-                break
-            elif time.time() -t > 0.2:
-                break
-        return data[data.find(self.magic_ftdi):]
+        tail = len(self.magic_ftdi)-1 # magic keyword may straddle two reads
+        chunksize = self._ftdi.read_data_get_chunksize() # one full USB bulk transfer per read
+        deadline = time.monotonic() + 0.2
+        wait = 0.001 # back-off between empty reads, doubled up to 10 ms
+        data = self._read(chunksize)
+        idx = data.find(self.magic_ftdi)
+        while idx == -1:
+            if time.monotonic() > deadline:
+                if not allow_timeout:
+                    log_cam.warning("Timeout in frame sync")
+                return None # data[-1:] would be a stray byte, not a frame
+            del data[:-tail] # keep only the bytes that can start a split magic keyword
+            chunk = self._read(chunksize)
+            if not chunk:
+                # Nothing streamed yet : don't spin on the USB bus until the deadline
+                time.sleep(wait)
+                wait = min(wait*2, 0.01)
+                continue
+            wait = 0.001
+            data.extend(chunk)
+            idx = data.find(self.magic_ftdi)
+        return data[idx:]
             
     def _send_data(self, data):
         """Send byte data to the camera
@@ -211,29 +347,34 @@ class FLIR_Tau2(object):
             Write bytesarray to the serial device
 
         """
-        self.dev.write(0x2, data)
+        self._ftdi.write_data(data)
 
-    def _receive_data(self, nbytes):
+    def _receive_data(self, nbytes, timeout=0.1):
         """Read bytes data from the camera
         
         Parameters
         ----------
         nbytes : int
             Number of bytes to read from the device
+        timeout : float
+            Maximum time in seconds to wait for the complete response
 
         Returns
         -------
-        res : bytes
-            Response of the camera
+        res : bytearray
+            Response of the camera (FTDI modem status bytes already stripped)
 
         """
         
-        time.sleep(0.1)
-        res = self.dev.read(0x81, nbytes)
+        deadline = time.monotonic() + timeout
+        res = self._ftdi.read_data_bytes(nbytes, 1)
+        while len(res) < nbytes and time.monotonic() < deadline:
+            res.extend(self._ftdi.read_data_bytes(nbytes-len(res), 1))
         return res
 
-    def _send_packet(self, command, argument=None):
-        """Send packet with command and argument to the camera
+    @staticmethod
+    def _build_packet(command, argument=None):
+        """Build packet with command and argument for the camera
 
         Parameters
         ----------
@@ -242,51 +383,120 @@ class FLIR_Tau2(object):
         argument : bytes
             Additional argument to provide [i.e struct.pack(">h", 0x0000)]
 
+        Returns
+        -------
+        data : bytes
+            Packet ready to be sent to the camera
+
         """
         if argument is None: 
-            argument = [] 
+            argument = b''
 
         # Refer to Tau 2 Software IDD 
         # Packet Protocol (Table 3.2) 
         packet_size = len(argument) 
         assert(packet_size == command.cmd_bytes)   
 
-        process_code = int(0x6E).to_bytes(1, 'big') 
-        status = int(0x00).to_bytes(1, 'big') 
-        function = command.code.to_bytes(1, 'big') 
+        # Header and first CRC are precomputed on the command (tau2_instructions.code.header)
+        packet = _PACKET_LAYOUT.get(packet_size)
+        if packet is None:
+            packet = _PACKET_LAYOUT[packet_size] = struct.Struct(">8s{}sH".format(packet_size))
+
+        if packet_size > 0:
+            # Second CRC is the CRC of the data (if any) 
+            return packet.pack(command.header, argument, binascii.crc_hqx(argument, 0))
+        return packet.pack(command.header)
 
-        # First CRC is the first 6 bytes of the packet 
-        # 1 - Process code 
-        # 2 - Status code 
-        # 3 - Reserved 
-        # 4 - Function 
-        # 5 - N Bytes MSB 
-        # 6 - N Bytes LSB 
+    def _send_packet(self, command, argument=None):
+        """Send packet with command and argument to the camera
 
-        packet = [process_code, status, function] 
-        packet.append( ((packet_size & 0xFF00) >> 8).to_bytes(1, 'big') ) 
-        packet.append( (packet_size & 0x00FF).to_bytes(1, 'big') ) 
-        crc_1 = binascii.crc_hqx(struct.pack("ccxccc", *packet), 0) 
+        Parameters
+        ----------
+        command : object tau2_instructions.code
+            Command to execute on the device
+        argument : bytes
+            Additional argument to provide [i.e struct.pack(">h", 0x0000)]
 
-        packet.append( ((crc_1 & 0xFF00) >> 8).to_bytes(1, 'big') ) 
-        packet.append( (crc_1 & 0x00FF).to_bytes(1, 'big') ) 
+        """
+        data = self._build_packet(command, argument)
+        log_cam.debug("CMD : Sending %s", data)
 
-        if packet_size > 0:
-            # Second CRC is the CRC of the data (if any) 
-            crc_2 = binascii.crc_hqx(argument, 0) 
-            packet.append(argument)
-            packet.append(((crc_2 & 0xFF00) >> 8).to_bytes(1, 'big')) 
-            packet.append((crc_2 & 0x00FF).to_bytes(1, 'big'))
-            fmt = ">cxcccccc{}scc".format(packet_size) 
-        else:
-            fmt = ">cxccccccxxx" 
+        self._send_data(data)
 
-        data = struct.pack(fmt, *packet) 
-        print("CMD : Sending {}".format(data))
+    def _send_cached_packet(self, command, argument=None):
+        """Send packet of a command whose argument is fixed, building it only on first use
+
+        Parameters
+        ----------
+        command : object tau2_instructions.code
+            Command to execute on the device
+        argument : bytes
+            Constant argument of the command [i.e struct.pack(">h", 0x000A)]
+
+        """
+        key = (command.code, argument)
+        data = _PACKETS.get(key)
+        if data is None:
+            data = _PACKETS[key] = self._build_packet(command, argument)
+        log_cam.debug("CMD : Sending %s", data)
 
         self._send_data(data)
+
+    def _query(self, function, argument=None):
+        """Send a fixed-argument command and read the reply of the camera
+
+        Parameters
+        ----------
+        function : object tau2_instructions.code
+            Function command to execute on the device
+        argument : bytes
+            Constant argument of the command [i.e struct.pack(">h", 0x000A)]
+
+        Returns
+        -------
+        res : tuple
+            Raw response from the camera in bytes
+
+        """
+        self._send_cached_packet(function, argument)
+        return self._read_packet(function)
+
+    def _query_int16(self, function, argument=None):
+        """Send a fixed-argument command and decode the reply as a signed 16-bit value
+
+        Parameters
+        ----------
+        function : object tau2_instructions.code
+            Function command to execute on the device
+        argument : bytes
+            Constant argument of the command [i.e struct.pack(">h", 0x000A)]
+
+        Returns
+        -------
+        value : int
+            Value returned by the camera
+        res : tuple
+            Raw response from the camera in bytes
+
+        """
+        res = self._query(function, argument)
+        return _S_I16.unpack(res[7])[0], res
+
+    def _queue_packet(self, command, argument=None):
+        """Queue packet with command and argument, sent later with flush_packets
+
+        Parameters
+        ----------
+        command : object tau2_instructions.code
+            Command to execute on the device
+        argument : bytes
+            Additional argument to provide [i.e struct.pack(">h", 0x0000)]
+
+        """
+        self._pending_packets.append(self._build_packet(command, argument))
+        self._pending_commands.append(command)
     
-    def _read_packet(self, function, post_delay=0.1):
+    def _read_packet(self, function, post_delay=None):
         """Read packet from the camera
 
         Parameters
@@ -294,7 +504,7 @@ class FLIR_Tau2(object):
         function : object tau2_instructions.code
             Function command to execute on the device
         post_delay : float
-            Waiting delay for the camera to respond
+            Waiting delay after the reply (default = function.post_delay)
 
         Returns
         -------
@@ -304,49 +514,69 @@ class FLIR_Tau2(object):
         """
         
         argument_length = function.reply_bytes
-        data = self._receive_data(10+2+argument_length)
-        data = data[2:] # remove 2 first bad bytes
-        
-        print("CMD : Received: {}".format(data))
+        data = self._receive_data(10+argument_length)
 
-        if self._check_header(data[:6]) and len(data) > 0:
-            if argument_length == 0:
-                res = struct.unpack(">ccxcccccxx", data)
-            else:
-                res = struct.unpack(">ccxccccc{}scc".format(argument_length), data)
-                #check_data_crc(res[7])
-        else:
-            res = None
-            print("CMD : Error reply from camera. Try re-sending command, or check parameters.")
+        res = self._parse_packet(function, data)
 
+        if post_delay is None:
+            post_delay = function.post_delay
         if post_delay > 0:
             time.sleep(post_delay)
 
         return res
 
+    def _parse_packet(self, function, data):
+        """Unpack a reply packet of the camera
+
+        Parameters
+        ----------
+        function : object tau2_instructions.code
+            Function command the reply belongs to
+        data : bytesarray
+            Reply of the camera
+
+        Returns
+        -------
+        res : tuple
+            Raw response from the camera in bytes (None if the reply is invalid)
+
+        """
+
+        argument_length = function.reply_bytes
+        log_cam.debug("CMD : Received: %s", data)
+
+        if len(data) >= 2 and self._check_header(data) and len(data) == 10+argument_length:
+            reply = _REPLY.get(argument_length)
+            if reply is None:
+                reply = _REPLY[argument_length] = struct.Struct(">ccxccccc{}scc".format(argument_length))
+            res = reply.unpack(data)
+            #check_data_crc(res[7])
+        else:
+            res = None
+            self._needs_purge = True # late or partial reply may still be in the buffers
+            log_cam.error("CMD : Error reply from camera. Try re-sending command, or check parameters.")
+
+        return res
+
     def _check_header(self, data):
         """Check if camera response is formatted successfully
         
         Parameters
         ----------
         data : bytesarray
-            Bytesarray coming from the serial device
+            Reply coming from the serial device (only the first bytes of the header are checked)
 
         Returns
         -------
         bool
 
         """
-        res = struct.unpack(">BBxBBB", data)
-
-        if res[0] != 0x6E:
-            print("CMD : Initial packet byte incorrect. Byte was: {}".format(res[0]))
-            return False
-
-        if not self._check_status(res[1]):
+        # Indexing a bytes-like object gives ints: data[0] is the process code, data[1] the status
+        if data[0] != 0x6E:
+            log_cam.warning("CMD : Initial packet byte incorrect. Byte was: %s", data[0])
             return False
 
-        return True
+        return self._check_status(data[1])
 
     def _check_status(self, code):
         """Check camera status
@@ -362,27 +592,9 @@ class FLIR_Tau2(object):
 
         """
 
-        if code == CAM_OK:
-            print("CMD : Response OK")
-            return True
-        elif code == CAM_BYTE_COUNT_ERROR:
-            print("CMD : Byte count error.")
-        elif code == CAM_FEATURE_NOT_ENABLED:
-            print("CMD : Feature not enabled.")
-        elif code == CAM_NOT_READY:
-            print("CMD : Camera not ready.")
-        elif code == CAM_RANGE_ERROR:
-            print("CMD : Camera range error.")
-        elif code == CAM_TIMEOUT_ERROR:
-            print("CMD : Camera timeout error.")
-        elif code == CAM_UNDEFINED_ERROR:
-            print("CMD : Camera returned an undefined error.")
-        elif code == CAM_UNDEFINED_FUNCTION_ERROR:
-            print("CMD : Camera function undefined. Check the function code.")
-        elif code == CAM_UNDEFINED_PROCESS_ERROR:
-            print("CMD : Camera process undefined.")
-
-        return False
+        msg, level, ok = _STATUS_TABLE.get(code, _STATUS_UNKNOWN)
+        log_cam.log(level, "CMD : %s", msg)
+        return ok
 
     def _check_mode(argument):
         def decorator(func):
@@ -395,26 +607,18 @@ class FLIR_Tau2(object):
                 Function/method to decorate
 
                 """
-                if argument == 'serial':
-                    if self.get_mode(display=False) == Ftdi.BitMode.RESET:
-                        result = func(self, *args, **kwargs)
-                    else:
-                        print("ERROR : current mode doesn't support serial communication")
-                        self.set_mode("serial")
-                        result = func(self, *args, **kwargs)
-                else:
-                    if self.get_mode(display=False) == Ftdi.BitMode.SYNCFF:
-                        result = func(self, *args, **kwargs)
-                    else:
-                        print("ERROR : current mode doesn't support syncff communication")
-                        self.set_mode("syncff")
-                        result = func(self, *args, **kwargs)
-                return result
+                # current_mode is kept in sync by connect/set_mode, no need to query the FTDI bitmode
+                if self.current_mode != argument:
+                    log_cam.warning("ERROR : current mode doesn't support %s communication", argument)
+                    self.set_mode(argument)
+                return func(self, *args, **kwargs)
             return wrapper
         return decorator
 
     def _flush_in_out(func):
-        """Decorator to flush input and output buffer before and after each instruction sent to the camera
+        """Decorator to flush input and output buffer before an instruction sent to the camera, if a previous exchange may have left stale bytes
+
+        Applied below _check_mode, so that a mode switch made by _check_mode is followed by the purge
         
         Parameters
         ----------
@@ -428,10 +632,10 @@ class FLIR_Tau2(object):
         """
         def decorated_func(self, *args, **kwargs):
 
-            self._ftdi.purge_buffers()
-            result = func(self, *args, **kwargs)
-            self._ftdi.purge_buffers()
-            return result
+            if self._needs_purge:
+                self._ftdi.purge_buffers()
+                self._needs_purge = False
+            return func(self, *args, **kwargs)
 
         return decorated_func
     
@@ -443,10 +647,64 @@ class FLIR_Tau2(object):
     def __exit__(self):
         """Exit the connection"""
         self.close()
-        print("========== ACQ : Disconnecting from camera ==========")
+        log_cam.info("========== ACQ : Disconnecting from camera ==========")
 
+    @_check_mode('serial')
     @_flush_in_out
+    def flush_packets(self):
+        """Send all queued packets and read back their replies
+
+        Getters are sent in a single USB write and their replies read back from one stream. As soon as the batch
+        holds a command that changes the camera state, the packets are sent one at a time, each after the reply
+        of the previous one, since the UART of the camera is not documented to accept back-to-back commands.
+
+        Returns
+        -------
+        results : list of tuple
+            Raw responses from the camera in bytes, in the order the packets were queued (None for invalid replies)
+
+        """
+
+        commands = self._pending_commands
+        packets = self._pending_packets
+        self._pending_packets = []
+        self._pending_commands = []
+        if not commands:
+            return []
+
+        if not all(command in _GETTERS for command in commands):
+            results = []
+            for command, packet in zip(commands, packets):
+                log_cam.debug("CMD : Sending %s", packet)
+                self._send_data(packet)
+                results.append(self._read_packet(command))
+            return results
+
+        data = b''.join(packets)
+        log_cam.debug("CMD : Sending %s", data)
+        self._send_data(data)
+
+        # Replies come back in order, each one is split at the byte count of its own header :
+        # an error reply carries no payload and must not shift the replies that follow it
+        data = bytearray()
+        offset = 0
+        results = []
+        for command in commands:
+            if len(data) < offset+8:
+                data.extend(self._receive_data(offset+8-len(data)))
+            header = data[offset:offset+8]
+            size = 10+command.reply_bytes
+            if len(header) == 8 and header[0] == 0x6E and _S_U16.unpack_from(header, 6)[0] == binascii.crc_hqx(header[:6], 0):
+                size = 10+_S_U16.unpack_from(header, 4)[0] # header is valid, trust its byte count
+            if len(data) < offset+size:
+                data.extend(self._receive_data(offset+size-len(data)))
+            results.append(self._parse_packet(command, data[offset:offset+size]))
+            offset += size
+
+        return results
+
     @_check_mode('serial')
+    @_flush_in_out
     def ping(self):
         """Ping the camera to see if it's alive
 
@@ -457,12 +715,11 @@ class FLIR_Tau2(object):
         """
         
         function = NO_OP
-        self._send_packet(function)
-        res = self._read_packet(function)
+        res = self._query(function)
         return res
 
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_serial_number(self):
         """Get serial number
 
@@ -473,14 +730,13 @@ class FLIR_Tau2(object):
         """
 
         function = GET_SERIAL_NUMBER
-        self._send_packet(function)
-        res = self._read_packet(function)
-        print("Camera serial: {}".format(int.from_bytes(res[7][:4], byteorder='big', signed=False)))
-        print("Sensor serial: {}".format(int.from_bytes(res[7][4:], byteorder='big', signed=False)))
+        res = self._query(function)
+        log_cam.info("Camera serial: %s", int.from_bytes(res[7][:4], byteorder='big', signed=False))
+        log_cam.info("Sensor serial: %s", int.from_bytes(res[7][4:], byteorder='big', signed=False))
         return res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_baud_rate(self):
         """Gets the baud rate of serial communication channel
 
@@ -494,27 +750,14 @@ class FLIR_Tau2(object):
         """
 
         function = GET_BAUD_RATE
-        self._send_packet(function)
-        res = self._read_packet(function)
-        baud_rate = struct.unpack(">h", res[7])[0]        
-        if baud_rate == 0:
-            print("BAUD RATE : 0X0000 = Auto baud")
-        elif baud_rate == 1:
-            print("BAUD RATE : 0X0001 = 9600 baud")
-        elif baud_rate == 2:
-            print("BAUD RATE : 0X0002 = 19200 baud")
-        elif baud_rate == 4:
-            print("BAUD RATE : 0X0004 = 57600 baud")
-        elif baud_rate == 5:
-            print("BAUD RATE : 0X0005 = 115200 baud")
-        elif baud_rate == 6:
-            print("BAUD RATE : 0X0006 = 460800 baud")
-        elif baud_rate == 7:
-            print("BAUD RATE : 0X0007 = 921600 baud")
+        baud_rate, res = self._query_int16(function)
+        msg = _BAUD_RATE_STR.get(baud_rate)
+        if msg is not None:
+            log_cam.info(msg)
         return baud_rate, res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_gain_mode(self):
         """Gets gain mode of the camera
 
@@ -528,21 +771,15 @@ class FLIR_Tau2(object):
         """
         
         function = GET_GAIN_MODE
-        self._send_packet(function)
-        res = self._read_packet(function)
-        gain_mode = res[7]        
-        if gain_mode == b'\x00\x00':
-            print("GAIN MODE : 0X0000 = Automatic")
-        elif gain_mode == b'\x00\x01':
-            print("GAIN MODE : 0X0001 = Low Gain Only")
-        elif gain_mode == b'\x00\x02':
-            print("GAIN MODE : 0X0002 = High Gain Only")
-        elif gain_mode == b'\x00\x03':
-            print("GAIN MODE : 0X0003 = Manual")
+        res = self._query(function)
+        gain_mode = res[7]
+        msg = _GAIN_MODE_STR.get(gain_mode)
+        if msg is not None:
+            log_cam.info(msg)
         return gain_mode, res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_gain_mode(self, gain_mode):
         """Sets gain mode of the camera
 
@@ -566,8 +803,8 @@ class FLIR_Tau2(object):
         res = self._read_packet(function)
         return res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_ace_correct(self):
         """Gets the Active Contrast Enhancement (ACE) Correction for AGC
 
@@ -582,17 +819,15 @@ class FLIR_Tau2(object):
 
         function = GET_AGC_ACE_CORRECT
         argument = None
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
-        ace_correct = struct.unpack(">h", res[7])[0]
+        ace_correct, res = self._query_int16(function, argument)
         if ace_correct == 0:
-            print("Active Contrast Enhancement : 0 = disabled")
+            log_cam.info("Active Contrast Enhancement : 0 = disabled")
         else:
-            print("Active Contrast Enhancement : {} = enabled".format(ace_correct))
+            log_cam.info("Active Contrast Enhancement : %s = enabled", ace_correct)
         return ace_correct, res
 
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def disable_ace_correct(self):
         """Disable the Active Contrast Enhancement (ACE) Correction for AGC
 
@@ -604,13 +839,12 @@ class FLIR_Tau2(object):
         """
 
         function = SET_AGC_ACE_CORRECT
-        argument = struct.pack(">h", 0x0000)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        argument = _ARG_ACE_CORRECT_OFF
+        res = self._query(function, argument)
         return res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_lens_number(self):
         """Get the lens number (which affects which correction terms are applied)
 
@@ -625,14 +859,13 @@ class FLIR_Tau2(object):
 
         function = GET_LENS_NUMBER
         argument = None
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        res = self._query(function, argument)
         lens_number = res[7]
-        print("Lens number: {}".format(struct.unpack(">h", res[7])[0]))
+        log_cam.info("Lens number: %s", _S_I16.unpack(res[7])[0])
         return lens_number, res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_lens_number(self, lens_number):
         """Set the lens number (which affects which correction terms are applied)
 
@@ -651,8 +884,8 @@ class FLIR_Tau2(object):
         res = self._read_packet(function)
         return res
 
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_fpa_temperature(self):
         """Get focal plane array (FPA) temperature in degree Celsius
 
@@ -666,16 +899,14 @@ class FLIR_Tau2(object):
         """
 
         function = GET_FPA_TEMPERATURE
-        argument = struct.pack(">h", 0x00)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
-        fpa_temperature = struct.unpack(">h", res[7])[0]
+        argument = _ARG_FPA_TEMPERATURE
+        fpa_temperature, res = self._query_int16(function, argument)
         fpa_temperature /= 10.0
-        print("FPA temp: {}C".format(fpa_temperature))
+        log_cam.info("FPA temp: %sC", fpa_temperature)
         return fpa_temperature, res
 
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_housing_temperature(self):
         """Get the housing temperature of the camera in degree Celsius
 
@@ -689,16 +920,72 @@ class FLIR_Tau2(object):
         """
 
         function = GET_HOUSING_TEMPERATURE
-        argument = struct.pack(">h", 0x0A)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
-        housing_temperature = struct.unpack(">h", res[7])[0]
+        argument = _ARG_HOUSING_TEMPERATURE
+        housing_temperature, res = self._query_int16(function, argument)
         housing_temperature /= 100.0
-        print("Housing temp: {}C".format(housing_temperature))
+        log_cam.info("Housing temp: %sC", housing_temperature)
         return housing_temperature, res
-    
-    @_flush_in_out
+
+    def poll_temperatures(self):
+        """Get FPA, housing and shutter temperatures in degree Celsius with a single USB write/read
+
+        Returns
+        -------
+        fpa_temperature : float
+            Temperature of the FPA in C (None if the reply is invalid)
+        housing_temperature : float
+            Temperature of the housing in C (None if the reply is invalid)
+        shutter_temperature : float
+            Temperature of the shutter in C (None if the reply is invalid)
+
+        """
+
+        self._queue_packet(GET_FPA_TEMPERATURE, _ARG_FPA_TEMPERATURE)
+        self._queue_packet(GET_HOUSING_TEMPERATURE, _ARG_HOUSING_TEMPERATURE)
+        self._queue_packet(GET_SHUTTER_TEMP)
+        results = self.flush_packets()
+
+        temperatures = []
+        for res, scale, name in zip(results, (10.0, 100.0, 100.0), ("FPA temp", "Housing temp", "SHUTTER temperature")):
+            if res is None:
+                temperatures.append(None)
+                log_cam.warning("%s: invalid reply from camera", name)
+            else:
+                temperatures.append(_S_I16.unpack(res[7])[0] / scale)
+                log_cam.info("%s: %sC", name, temperatures[-1])
+        return tuple(temperatures)
+
+    def get_cached_temperatures(self, max_age=30.0):
+        """Get FPA and housing temperatures, querying the camera only when cached values are too old
+
+        Parameters
+        ----------
+        max_age : float
+            Maximum age in seconds of the cached temperatures
+
+        Returns
+        -------
+        fpa_temperature : float
+            Temperature of the FPA in C
+        housing_temperature : float
+            Temperature of the housing in C
+
+        If a reply is invalid, the cache is left untouched : the previous cached values are returned
+        (None if there are none yet) and the camera is queried again on the next call.
+
+        """
+
+        now = time.monotonic()
+        if self._temperatures is None or now - self._temperatures_time > max_age:
+            fpa_temperature, housing_temperature, _ = self.poll_temperatures()
+            if fpa_temperature is None or housing_temperature is None:
+                return self._temperatures if self._temperatures is not None else (fpa_temperature, housing_temperature)
+            self._temperatures = (fpa_temperature, housing_temperature)
+            self._temperatures_time = now
+        return self._temperatures
+
     @_check_mode('serial')
+    @_flush_in_out
     def get_shutter_temperature(self):
         """Gets the temperature of the shutter (both internal & external) as used for radiometry.
 
@@ -713,15 +1000,13 @@ class FLIR_Tau2(object):
 
         function = GET_SHUTTER_TEMP
         argument = None
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
-        shutter_temperature = struct.unpack(">h", res[7])[0]
+        shutter_temperature, res = self._query_int16(function, argument)
         shutter_temperature /= 100.0
-        print("SHUTTER temperature = {}C".format(shutter_temperature))
+        log_cam.info("SHUTTER temperature = %sC", shutter_temperature)
         return shutter_temperature, res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_shutter_temperature_mode(self):
         """Gets the mode of shutter temperature usage.
 
@@ -732,22 +1017,16 @@ class FLIR_Tau2(object):
         """
         
         function = GET_SHUTTER_TEMP_MODE
-        arg1=b'\x00\x01'
-        arg2=b'\x00\x00'
-        argument=arg1+arg2
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        argument = _ARG_SHUTTER_TEMP_MODE
+        res = self._query(function, argument)
         shutter_temperature_mode = res[7]
-        if shutter_temperature_mode == b'\x00\x00':
-            print("SHUTTER TEMP MODE : 0X0000 = User, User specified shutter temperature")
-        elif shutter_temperature_mode == b'\x00\x01':
-            print("SHUTTER TEMP MODE : 0X0001 = Automatic, calibrated temperatures")
-        elif shutter_temperature_mode == b'\x00\x02':
-            print("SHUTTER TEMP MODE : 0x0002 = Static, shutter-less operation")
+        msg = _SHUTTER_TEMP_MODE_STR.get(shutter_temperature_mode)
+        if msg is not None:
+            log_cam.info(msg)
         return shutter_temperature_mode, res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_shutter_temperature_mode(self, shutter_temperature_mode):
         """Sets the mode of shutter temperature usage.
 
@@ -764,15 +1043,13 @@ class FLIR_Tau2(object):
         """
 
         function = SET_SHUTTER_TEMP_MODE
-        arg1 = b'\x00\x00'
-        arg2 = shutter_temperature_mode
-        argument = arg1 + arg2
+        argument = _PREFIX_SHUTTER_TEMP_MODE + shutter_temperature_mode
         self._send_packet(function, argument)
         res = self._read_packet(function)
         return res
         
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_shutter_temperature(self, shutter_temperature):
         """Sets the temperature of the shutter (both internal & external) as used for radiometry.
 
@@ -789,13 +1066,46 @@ class FLIR_Tau2(object):
         """
 
         function = SET_SHUTTER_TEMP
-        argument = struct.pack(">h", int(shutter_temperature*100))
+        argument = _S_I16.pack(int(shutter_temperature*100))
         self._send_packet(function, argument)
         res = self._read_packet(function)
         return res
-    
-    @_flush_in_out
+
+    def update_shutter_temperature(self, shutter_temperature, tolerance=0.05, retries=5):
+        """Sets the shutter temperature only if it differs from the current one, then checks it.
+
+        Parameters
+        ----------
+        shutter_temperature : float
+            Shutter temperature for FFC calibration
+        tolerance : float
+            Accepted difference in C between requested and returned temperature
+        retries : int
+            Maximum number of set/get attempts
+
+        Returns
+        -------
+        bool
+            If True, shutter temperature is within tolerance
+
+        """
+
+        q_shutter_temperature, _ = self.get_shutter_temperature()
+        if abs(q_shutter_temperature - shutter_temperature) < tolerance:
+            return True
+
+        for k in range(retries):
+            self.set_shutter_temperature(shutter_temperature)
+            time.sleep(0.05*(k+1))
+            q_shutter_temperature, _ = self.get_shutter_temperature()
+            if abs(q_shutter_temperature - shutter_temperature) < tolerance:
+                return True
+
+        log_cam.warning("CMD : SHUTTER TEMPERATURE IS NOT CONFIGURED PROPERLY")
+        return False
+
     @_check_mode('serial')
+    @_flush_in_out
     def do_ffc_short(self):
         """Execute short flat field correction (FFC)
 
@@ -806,15 +1116,14 @@ class FLIR_Tau2(object):
 
         """
         
-        print("========== FFC IN PROGRESS ==========")
+        log_cam.info("========== FFC IN PROGRESS ==========")
         function = DO_FFC_SHORT
-        self._send_packet(function)
-        res = self._read_packet(function)
-        print("========== FFC DONE ==========")
+        res = self._query(function)
+        log_cam.info("========== FFC DONE ==========")
         return res
         
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def do_ffc_long(self):
         """Execute long flat field correction (FFC)
 
@@ -825,16 +1134,14 @@ class FLIR_Tau2(object):
 
         """
         function = DO_FFC_LONG
-        argument = struct.pack(">h", 0x0001)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
-        ffc_state = struct.unpack(">h", res[7])[0]
+        argument = _ARG_FFC_LONG
+        ffc_state, res = self._query_int16(function, argument)
         if ffc_state == -1:
-            print("LONG FFC DONE : 0XFFFF = executed")
+            log_cam.info("LONG FFC DONE : 0XFFFF = executed")
         return res
 
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_planck_coefficients(self):
         """Get the Planck coefficients (RBFO) used to convert flux to temperature
 
@@ -848,23 +1155,19 @@ class FLIR_Tau2(object):
         """
 
         function = GET_PLANCK_COEFFICIENTS
-        argument = struct.pack(">h", 0x0200)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        argument = _ARG_PLANCK_COEFFICIENTS
+        res = self._query(function, argument)
         res = res[7]
-        R = struct.unpack(">I", res[0:4])[0]
-        B = struct.unpack(">I", res[4:8])[0]
-        F = struct.unpack(">I", res[8:12])[0]
-        O = struct.unpack(">i", res[12:16])[0]
-        print('R:', R)
-        print('B:', B)
-        print('F:', F)
-        print('O:', O)
+        R, B, F, O = _S_PLANCK.unpack(res)
+        log_cam.info("R: %s", R)
+        log_cam.info("B: %s", B)
+        log_cam.info("F: %s", F)
+        log_cam.info("O: %s", O)
         RBFO = (R, B, F, O)
         return RBFO, res
 
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_ffc_mode(self):
         """Get the FFC mode (manual, automatic or external)
 
@@ -879,19 +1182,15 @@ class FLIR_Tau2(object):
 
         function = GET_FFC_MODE
         argument = None
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        res = self._query(function, argument)
         ffc_mode = res[7]
-        if ffc_mode == b'\x00\x00':
-            print("FFC MODE : 0X0000 = Manual")
-        elif ffc_mode == b'\x00\x01':
-            print("FFC MODE : 0X0001 = Automatic")
-        elif ffc_mode == b'\x00\x02':
-            print("FFC MODE : 0X0002 =  External")
+        msg = _FFC_MODE_STR.get(ffc_mode)
+        if msg is not None:
+            log_cam.info(msg)
         return ffc_mode, res
 
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_ffc_mode(self, ffc_mode):
         """Set the FFC mode (manual, automatic or external)
 
@@ -913,8 +1212,8 @@ class FLIR_Tau2(object):
         res = self._read_packet(function)
         return res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_ffc_frames(self):
         """Get the number of integrated frames during FFC.
 
@@ -928,22 +1227,16 @@ class FLIR_Tau2(object):
         """
         
         function = GET_FFC_NFRAMES
-        arg1=b'\x00\x03'
-        arg2=b'\x00\x00'
-        argument=arg1+arg2
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        argument = _ARG_FFC_NFRAMES
+        res = self._query(function, argument)
         ffc_frames = res[7]
-        if ffc_frames == b'\x00\x00':
-            print("FFC NFRAMES : 0X0000 = 4 frames")
-        elif ffc_frames == b'\x00\x01':
-            print("FFC NFRAMES : 0X0001 = 8 frames")
-        elif ffc_frames == b'\x00\x02':
-            print("FFC NFRAMES : 0X0002 =  16 frames")
+        msg = _FFC_FRAMES_STR.get(ffc_frames)
+        if msg is not None:
+            log_cam.info(msg)
         return ffc_frames, res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_ffc_frames(self, ffc_frames):
         """Set the number of integrated frames during FFC.
 
@@ -960,15 +1253,13 @@ class FLIR_Tau2(object):
         """
         
         function = SET_FFC_NFRAMES
-        arg1 = b'\x00\x02'
-        arg2 = ffc_frames
-        argument = arg1+arg2
+        argument = _PREFIX_FFC_NFRAMES + ffc_frames
         self._send_packet(function, argument)
         res = self._read_packet(function)
         return res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_xp_mode(self):
         """Gets the XP Mode
 
@@ -982,24 +1273,16 @@ class FLIR_Tau2(object):
         """
         
         function = GET_XP_MODE
-        argument = struct.pack(">h", 0x0200)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        argument = _ARG_XP_MODE
+        res = self._query(function, argument)
         xp_mode = res[7]
-        if xp_mode == b'\x00\x00':
-            print("XP MODE : 0x0000 = DISABLED")
-        elif xp_mode == b'\x00\x01':
-            print("XP MODE : 0x0001 = BT656")
-        elif xp_mode == b'\x00\x02':
-            print("XP MODE : 0x0002 = CMOS 14-bit w/ 1 discrete")
-        elif xp_mode == b'\x00\x03':
-            print("XP MODE : 0x0003 = CMOS 8-bit w/ 8 discretes")
-        elif xp_mode == b'\x00\x04':
-            print("XP MODE : 0x0004 = CMOS 16-bit")
+        msg = _XP_MODE_STR.get(xp_mode)
+        if msg is not None:
+            log_cam.info(msg)
         return xp_mode, res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_xp_mode(self, xp_mode):
         """Sets the XP Mode
         
@@ -1016,15 +1299,13 @@ class FLIR_Tau2(object):
         """
         
         function = SET_XP_MODE
-        arg1 = b'\x03'
-        arg2 = xp_mode
-        argument = arg1+arg2
+        argument = _PREFIX_XP_MODE + xp_mode
         self._send_packet(function, argument)
         res = self._read_packet(function)
         return res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_cmos_bit_depth(self):
         """Gets the CMOS mode Bit Depth (8 or 14bit)
 
@@ -1038,24 +1319,16 @@ class FLIR_Tau2(object):
         """
         
         function = GET_CMOS_BIT_DEPTH
-        argument = struct.pack(">h", 0x0800)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        argument = _ARG_CMOS_BIT_DEPTH
+        res = self._query(function, argument)
         cmos_bit_depth = res[7]
-        if cmos_bit_depth == b'\x00\x00':
-            print("CMOS BIT DEPTH : 0x0000 = 14bit")
-        elif cmos_bit_depth == b'\x00\x01':
-            print("CMOS BIT DEPTH : 0x0001 = 8bit post-AGC/pre-colorize")
-        elif cmos_bit_depth == b'\x00\x02':
-            print("CMOS BIT DEPTH : 0x0002 = 8bit Bayer encoded")
-        elif cmos_bit_depth == b'\x00\x03':
-            print("CMOS BIT DEPTH : 0x0003 = 16bit YCbCr")
-        elif cmos_bit_depth == b'\x00\x04':
-            print("CMOS BIT DEPTH : 0x0004 = 8bit 2x Clock YCbCr")
+        msg = _CMOS_BIT_DEPTH_STR.get(cmos_bit_depth)
+        if msg is not None:
+            log_cam.info(msg)
         return cmos_bit_depth, res
 
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_cmos_bit_depth(self, cmos_bit_depth):
         """Sets the CMOS mode Bit Depth (8 or 14bit)
 
@@ -1071,15 +1344,13 @@ class FLIR_Tau2(object):
         """
         
         function = SET_CMOS_BIT_DEPTH
-        arg1 = b'\x06'
-        arg2 = cmos_bit_depth
-        argument = arg1+arg2
+        argument = _PREFIX_CMOS_BIT_DEPTH + cmos_bit_depth
         self._send_packet(function, argument)
         res = self._read_packet(function)
         return res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_tlinear_resolution(self):
         """Get the resolution of the TLinear
 digital video.
@@ -1094,18 +1365,16 @@ digital video.
         """
         
         function = GET_TLINEAR_MODE
-        argument = struct.pack(">h", 0x0010)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        argument = _ARG_TLINEAR_RESOLUTION
+        res = self._query(function, argument)
         tlinear_resolution = res[7]
-        if tlinear_resolution == b'\x00\x00':
-            print("TLIN OUTPUT MODE : 0x0000 = Low resolution mode")
-        elif tlinear_resolution == b'\x00\x01':
-            print("TLIN OUTPUT MODE : 0x0001 = High resolution mode")
+        msg = _TLINEAR_RESOLUTION_STR.get(tlinear_resolution)
+        if msg is not None:
+            log_cam.info(msg)
         return tlinear_resolution, res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_tlinear_resolution(self, tlinear_resolution):
         """Set the resolution of the TLinear
 digital video.
@@ -1124,15 +1393,13 @@ digital video.
         """
         
         function = SET_TLINEAR_MODE
-        arg1 = b'\x00\x10'
-        arg2 = tlinear_resolution
-        argument = arg1+arg2
+        argument = _ARG_TLINEAR_RESOLUTION + tlinear_resolution
         self._send_packet(function, argument)
         res = self._read_packet(function)
         return res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_tlinear_mode(self):
         """Get Tlinear status.
         In normal mode with TLinear disabled, the Tau camera outputs digital data linear in radiometric flux.
@@ -1150,18 +1417,16 @@ digital video.
         """
         
         function = GET_TLINEAR_MODE
-        argument = struct.pack(">h", 0x0040)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)
+        argument = _ARG_TLINEAR_MODE
+        res = self._query(function, argument)
         tlinear_mode = res[7]
-        if tlinear_mode == b'\x00\x00':
-            print("TLIN MODE DISABLED : 0x0000 = disabled")
-        elif tlinear_mode == b'\x00\x01':
-            print("TLIN MODE ENABLED : 0x0001 = enabled")
+        msg = _TLINEAR_MODE_STR.get(tlinear_mode)
+        if msg is not None:
+            log_cam.info(msg)
         return tlinear_mode, res
     
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def set_tlinear_mode(self, tlinear_mode):
         """Enables/disables TLinear output
         
@@ -1178,15 +1443,13 @@ digital video.
         """
         
         function = SET_TLINEAR_MODE
-        arg1 = b'\x00\x40'
-        arg2 = tlinear_mode
-        argument = arg1+arg2
+        argument = _ARG_TLINEAR_MODE + tlinear_mode
         self._send_packet(function, argument)
         res = self._read_packet(function)
         return res
         
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_lens_parameters(self):
         """Gets lens parameters for the calculated responsivity
 
@@ -1198,18 +1461,17 @@ digital video.
         """
         
         function = GET_LENS_RESPONSE_PARAMS
-        argument = struct.pack(">h", 0x0000)
-        self._send_packet(function, argument)
-        res = self._read_packet(function)        
+        argument = _ARG_LENS_RESPONSE_PARAMS
+        res = self._query(function, argument)
         res = b''.join(res)
-        focal_ratio = struct.unpack(">h", res[7:9])[0]
-        transmission = struct.unpack(">h", res[9:11])[0]
-        print("Focal ratio: {}".format(focal_ratio))
-        print("Transmission: {}".format(transmission))
+        focal_ratio = _S_I16.unpack_from(res, 7)[0]
+        transmission = _S_I16.unpack_from(res, 9)[0]
+        log_cam.info("Focal ratio: %s", focal_ratio)
+        log_cam.info("Transmission: %s", transmission)
         return res
         
-    @_flush_in_out
     @_check_mode('serial')
+    @_flush_in_out
     def get_scene_parameters(self):
         """Gets scene parameters for radiometric calculations
         
@@ -1243,11 +1505,9 @@ digital video.
              }
         
         for key, value in d2.items():
-            argument = struct.pack(">h", value)
-            self._send_packet(function, argument)
-            res = self._read_packet(function)
-            d1[key] = struct.unpack(">h", res[7])[0]
-            print("{} : {}".format(key, d1[key]))
+            argument = _S_I16.pack(value)
+            d1[key], res = self._query_int16(function, argument)
+            log_cam.info("%s : %s", key, d1[key])
     
     def check_settings(self):
         """Check and set custom settings
@@ -1261,87 +1521,58 @@ digital video.
         
         settings_state = True
 
-        # 1. Enable high gain mode only
-        _ = self.set_gain_mode(gain_mode=default_settings['gain_mode']['bytes'])
-        q_gain_mode, _ = self.get_gain_mode()
-
-        if q_gain_mode != default_settings['gain_mode']['bytes']:
-            print("CMD : GAIN MODE IS NOT CONFIGURED PROPERLY")
-            settings_state = False
-        else:
-            print("CMD : GAIN MODE IS CONFIGURED PROPERLY")
-
-        # 2. Check lens number configuration
-        """
-        _ = self.set_lens_number(lens_number=default_settings['lens_number']['bytes'])
-        q_lens_number, _ = self.get_lens_number()
-
-        if q_lens_number != default_settings['lens_number']['bytes']:
-            print("CMD : LENS NUMBER IS NOT CONFIGURED PROPERLY")
-            settings_state = False
-        else:
-            print("CMD : LENS NUMBER IS CONFIGURED PROPERLY")
-        """
-            
-        # 3. Check shutter temperature mode
-        _ = self.set_shutter_temperature_mode(shutter_temperature_mode=default_settings['shutter_temperature_mode']['bytes'])
-        q_shutter_temperature_mode, _ = self.get_shutter_temperature_mode()
-
-        if q_shutter_temperature_mode != default_settings['shutter_temperature_mode']['bytes']:
-            print("CMD : SHUTTER TEMPERATURE MODE IS NOT CONFIGURED PROPERLY")
-            settings_state = False
-        else:
-            print("CMD : SHUTTER TEMPERATURE MODE IS CONFIGURED PROPERLY")
-
-        # 4. Check FFC mode
-        _ = self.set_ffc_mode(ffc_mode=default_settings['ffc_mode']['bytes'])
-        q_ffc_mode, _ = self.get_ffc_mode()
-
-        if q_ffc_mode != default_settings['ffc_mode']['bytes']:
-            print("CMD : FFC MODE IS NOT CONFIGURED PROPERLY")
-            settings_state = False
-        else:
-            print("CMD : FFC MODE IS CONFIGURED PROPERLY")
-
-        # 5. Check FFC frames
-        _ = self.set_ffc_frames(ffc_frames=default_settings['ffc_frames']['bytes'])
-        q_ffc_frames, _ = self.get_ffc_frames()
-
-        if q_ffc_frames != default_settings['ffc_frames']['bytes']:
-            print("CMD : FFC FRAMES IS NOT CONFIGURED PROPERLY")
-            settings_state = False
-        else:
-            print("CMD : FFC FRAMES IS CONFIGURED PROPERLY")
-
-        # 6. Check bit depth
-        _ = self.set_xp_mode(xp_mode=default_settings['xp_mode']['bytes'])
-        q_xp_mode, _ = self.get_xp_mode()
-
-        if q_xp_mode != default_settings['xp_mode']['return']:
-            print("CMD : XP MODE IS NOT CONFIGURED PROPERLY")
-            settings_state = False
-        else:
-            print("CMD : XP MODE IS CONFIGURED PROPERLY")
-
-        # 7. Check CMOS bit depth
-        _ = self.set_cmos_bit_depth(cmos_bit_depth=default_settings['cmos_bit_depth']['bytes'])
-        q_cmos_bit_depth, _ = self.get_cmos_bit_depth()
-
-        if q_cmos_bit_depth != default_settings['cmos_bit_depth']['return']:
-            print("CMD : CMOS BITDEPTH IS NOT CONFIGURED PROPERLY")
-            settings_state = False
-        else:
-            print("CMD : CMOS BITDEPTH IS CONFIGURED PROPERLY")
-
-        # 8. Check Tlinear Tlinear state
-        _ = self.set_tlinear_mode(tlinear_mode=default_settings['tlinear_mode']['bytes'])
-        q_tlinear_mode, _ = self.get_tlinear_mode()
-
-        if q_tlinear_mode != default_settings['tlinear_mode']['bytes']:
-            print("CMD : TLINEAR MODE IS NOT CONFIGURED PROPERLY")
-            settings_state = False
-        else:
-            print("CMD : TLINEAR MODE IS CONFIGURED PROPERLY")
+        # (name, getter command, getter argument, descriptions, setter command, setter argument, value returned when configured)
+        settings = [("GAIN MODE", GET_GAIN_MODE, None, _GAIN_MODE_STR, SET_GAIN_MODE,
+                     default_settings['gain_mode']['bytes'], default_settings['gain_mode']['bytes']),
+                    # ("LENS NUMBER", GET_LENS_NUMBER, None, {}, SET_LENS_NUMBER,
+                    #  default_settings['lens_number']['bytes'], default_settings['lens_number']['bytes']),
+                    ("SHUTTER TEMPERATURE MODE", GET_SHUTTER_TEMP_MODE, _ARG_SHUTTER_TEMP_MODE, _SHUTTER_TEMP_MODE_STR, SET_SHUTTER_TEMP_MODE,
+                     _PREFIX_SHUTTER_TEMP_MODE + default_settings['shutter_temperature_mode']['bytes'], default_settings['shutter_temperature_mode']['bytes']),
+                    ("FFC MODE", GET_FFC_MODE, None, _FFC_MODE_STR, SET_FFC_MODE,
+                     default_settings['ffc_mode']['bytes'], default_settings['ffc_mode']['bytes']),
+                    ("FFC FRAMES", GET_FFC_NFRAMES, _ARG_FFC_NFRAMES, _FFC_FRAMES_STR, SET_FFC_NFRAMES,
+                     _PREFIX_FFC_NFRAMES + default_settings['ffc_frames']['bytes'], default_settings['ffc_frames']['bytes']),
+                    ("XP MODE", GET_XP_MODE, _ARG_XP_MODE, _XP_MODE_STR, SET_XP_MODE,
+                     _PREFIX_XP_MODE + default_settings['xp_mode']['bytes'], default_settings['xp_mode']['return']),
+                    ("CMOS BITDEPTH", GET_CMOS_BIT_DEPTH, _ARG_CMOS_BIT_DEPTH, _CMOS_BIT_DEPTH_STR, SET_CMOS_BIT_DEPTH,
+                     _PREFIX_CMOS_BIT_DEPTH + default_settings['cmos_bit_depth']['bytes'], default_settings['cmos_bit_depth']['return']),
+                    ("TLINEAR MODE", GET_TLINEAR_MODE, _ARG_TLINEAR_MODE, _TLINEAR_MODE_STR, SET_TLINEAR_MODE,
+                     _ARG_TLINEAR_MODE + default_settings['tlinear_mode']['bytes'], default_settings['tlinear_mode']['bytes'])
+                   ]
+        values = [None]*len(settings)
+
+        def read_settings(indices):
+            # All getters of the batch in a single USB write and a single read
+            for k in indices:
+                self._queue_packet(settings[k][1], settings[k][2])
+            for k, res in zip(indices, self.flush_packets()):
+                values[k] = None if res is None else res[7]
+
+        # 1. Read the current settings, the camera usually keeps them between sessions
+        read_settings(range(len(settings)))
+
+        # 2. Send only the settings read back with a different value, then read them back
+        #    (an invalid reply leaves the setting unknown, never write the camera because of it)
+        mismatches = [k for k, setting in enumerate(settings) if values[k] is not None and values[k] != setting[6]]
+        if mismatches:
+            for k in mismatches:
+                self._queue_packet(settings[k][4], settings[k][5])
+            _ = self.flush_packets()
+            read_settings(mismatches)
+
+        # 3. Check all settings, each value description followed by its status
+        for (name, _, _, descriptions, _, _, expected), value in zip(settings, values):
+            msg = descriptions.get(value)
+            if msg is not None:
+                log_cam.info(msg)
+            if value is None:
+                log_cam.warning("CMD : %s COULD NOT BE READ", name)
+                settings_state = False
+            elif value != expected:
+                log_cam.warning("CMD : %s IS NOT CONFIGURED PROPERLY", name)
+                settings_state = False
+            else:
+                log_cam.info("CMD : %s IS CONFIGURED PROPERLY", name)
             
         return settings_state
 
@@ -1366,17 +1597,16 @@ digital video.
         """
         
         for s in range(0, sequence):
-            data = b''            
+            data = bytearray() # grows in place, bytes concatenation copies the whole buffer each read
             self._ftdi.purge_buffers()
-            print("Read buffer for {} seconds".format(duration))
-            t = time.time()
-            t_format = time.strftime('%Y-%m-%dT%H:%M:%S')
-            while time.time()-t < duration: 
-                data += self._read()
+            log_cam.info("Read buffer for %s seconds", duration)
+            chunksize = self._ftdi.read_data_get_chunksize() # one full USB bulk transfer per read
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                data.extend(self._read(chunksize))
                 
             if len(data)>self.frame_size:
                 list_img = self.create_images(data)
-                list_img = [i for i in list_img if i is not None]
                 if display == True:
                     self.plot_images(list_img)
                 return list_img
@@ -1392,31 +1622,33 @@ digital video.
         Returns
         -------
         list_img : list of np.array
-            List of images
+            List of valid images (corrupted frames are skipped)
 
         """
         
         pos = []
-        pos.append(data.find(self.magic_ftdi))
-        i=0
-        while data.find(self.magic_ftdi, pos[i]+1) != -1:
-            pos.append(data.find(self.magic_ftdi, pos[i]+1))
-            i=i+1
+        p = data.find(self.magic_ftdi)
+        while p != -1: # each match is searched only once
+            pos.append(p)
+            if data.startswith(self.magic_ftdi, p+self.frame_size): # next frame follows directly, no need to scan the pixels
+                p += self.frame_size
+            else:
+                p = data.find(self.magic_ftdi, p+1)
             
-        list_img = []
-        for i in range(1, len(pos)):
-            if pos[i]-pos[i-1] == self.frame_size:
-                array = np.frombuffer(data[pos[i-1]+10:pos[i]], dtype='uint16') # to 16 bits
-                array_14bits = array & 0x3FFF # rescale to 14 bits
-                array_14bits = array_14bits.reshape(512, 642) # reshape
-                array_14bits = np.delete(array_14bits, [0, -1], 1) # remove first and last columns containing zeros
-                array_14bits = array_14bits.view('int16') # transform to signed int16
-                if 255 in array_14bits:
-                    list_img.append(None)
-                else:
-                    list_img.append(array_14bits)
+        starts = [pos[i-1]+10 for i in range(1, len(pos)) if pos[i]-pos[i-1] == self.frame_size] # complete frames only
+        frames = np.empty((len(starts), 512, 640), dtype='uint16') # all frames in one block
+        for k, start in enumerate(starts):
+            array = np.frombuffer(data, dtype='uint16', count=(self.frame_size-10)//2, offset=start) # to 16 bits, no copy of the frame
+            frames[k] = array.reshape(512, 642)[:, 1:-1] # reshape, drop first and last columns containing zeros
+        frames &= 0x3FFF # rescale to 14 bits, all frames at once
+        frames = frames.view('int16') # transform to signed int16
+
+        valid = ~np.any(frames == 255, axis=(1, 2)) # frames containing the 255 marker are corrupted
+        if not valid.all():
+            frames = frames[valid]
+        list_img = list(frames)
         
-        print("Image sequence sliced")
+        log_cam.info("Image sequence sliced")
         return list_img
 
     def plot_images(self, list_img):
@@ -1429,6 +1661,8 @@ digital video.
 
         """
 
+        import matplotlib.pyplot as plt # only needed for display, slow to import
+
         for img in list_img:
             if img is not None:
                 plt.figure()
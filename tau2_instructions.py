@@ -8,12 +8,21 @@
 ## Date : 2022-07-28
 ##################################################
 
+import binascii
+import struct
+
 class code(object):
     """Class for cmd requests to the FLIR Tau2 Camera"""
-    def __init__(self, code = 0, cmd_bytes = 0, reply_bytes = 0):
+    def __init__(self, code = 0, cmd_bytes = 0, reply_bytes = 0, post_delay = 0):
         self.code = code # function code
         self.cmd_bytes = cmd_bytes # byte count get/set cmd
         self.reply_bytes = reply_bytes # byte count reply
+        self.post_delay = post_delay # processing time (s) the camera needs after replying
+
+        # Packet header and its CRC only depend on the function code and byte count (Tau 2 Software IDD, Table 3.2)
+        # 1 - Process code, 2 - Status code, 3 - Reserved, 4 - Function, 5 - N Bytes MSB, 6 - N Bytes LSB
+        header = struct.pack(">BBxBH", 0x6E, 0x00, code, cmd_bytes)
+        self.header = header + struct.pack(">H", binascii.crc_hqx(header, 0)) # 8 bytes sent before the argument
 
 # ========== Tau2 commands from official software IDD ========== #
 
@@ -30,9 +39,9 @@ CAM_FEATURE_NOT_ENABLED= 0x0A
 
 # General Commands
 NO_OP = code(0x00, 0, 0)
-SET_DEFAULTS = code(0x01, 0, 0)
-CAMERA_RESET = code(0x02, 0, 0)
-RESTORE_FACTORY_DEFAULTS = code(0x03, 0, 0)
+SET_DEFAULTS = code(0x01, 0, 0, 0.1)
+CAMERA_RESET = code(0x02, 0, 0, 0.1)
+RESTORE_FACTORY_DEFAULTS = code(0x03, 0, 0, 0.1)
 GET_SERIAL_NUMBER = code(0x04, 0, 8)
 GET_REVISION = code(0x05, 0, 8)
 GET_BAUD_RATE = code(0x07, 0, 2)
@@ -47,8 +56,8 @@ GET_FFC_MODE = code(0x0B, 0, 2)
 SET_FFC_MODE = code(0x0B, 2, 2)
 GET_FFC_NFRAMES = code(0x0B, 4, 2)
 SET_FFC_NFRAMES = code(0x0B, 4, 0)
-DO_FFC_SHORT = code(0x0C, 0, 0)
-DO_FFC_LONG = code(0x0C, 2, 2)
+DO_FFC_SHORT = code(0x0C, 0, 0, 0.1)
+DO_FFC_LONG = code(0x0C, 2, 2, 0.1)
 GET_FFC_PERIOD = code(0x0D, 0, 4)
 SET_FFC_PERIOD_LOW_GAIN = code(0x0D, 2, 2)
 SET_FFC_PERIOD_HIGH_GAIN = code(0x0D, 2, 2)
@@ -59,7 +68,7 @@ SET_FFC_TEMP_DELTA_HIGH_GAIN = code(0x0E, 2, 2)
 SET_FFC_TEMP_DELTA = code(0x0E, 4, 4)
 GET_FFC_WARN_TIME = code(0x3C, 0, 2)
 SET_FFC_WARN_TIME = code(0x3C, 2, 2)
-WRITE_NVFFC_TABLE = code(0xC6, 0, 0)
+WRITE_NVFFC_TABLE = code(0xC6, 0, 0, 0.1)
 
 # Image processing
 GET_DIGITAL_OUTPUT_MODE = code(0x12, 0, 2)